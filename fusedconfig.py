@@ -32,13 +32,59 @@
     SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 import os
-import inspect
+import sys
+import functools
 import warnings
-import argparse
-import json
+# argparse and json are imported where they are used
+# to keep the import of this module cheap
 
 __all__=['FusedConfig']
 
+_Dest_Trans=str.maketrans('-','_')
+
+#
+# copied from argparse.py
+# _ActionsContainer#_get_optional_kwargs()
+# https://github.com/python/cpython/blob/3.13/Lib/argparse.py#L1586C9-L1586C29
+#
+# The same option strings are seen again whenever a config is rebuilt,
+# so the result is memoized on (option strings, dest).
+#
+@functools.lru_cache(maxsize=512)
+def _build_destname_cached(args,dest):
+    prefix_chars='-'
+    
+    # determine short and long option strings
+    option_strings = []
+    long_option_strings = []
+    for option_string in args:
+        # error on strings that don't start with an appropriate prefix
+        if not option_string[0] in prefix_chars:
+            raise ValueError(
+                f'invalid option string {option_string}: '
+                f'must start with a character {prefix_chars}'
+            )
+        
+        # strings starting with two prefix characters are long options
+        option_strings.append(option_string)
+        if len(option_string) > 1 and option_string[1] in prefix_chars:
+            long_option_strings.append(option_string)
+        
+    # infer destination, '--foo-bar' -> 'foo_bar' and '-x' -> 'x'
+    if dest is None:
+        if long_option_strings:
+            dest_option_string = long_option_strings[0]
+        else:
+            dest_option_string = option_strings[0]
+        dest = dest_option_string.lstrip(prefix_chars)
+        if not dest:
+            raise ValueError(
+                f'dest= is required for options like {option_string!r}'
+            )
+        dest = dest.translate(_Dest_Trans)
+
+    return dest
+
 ########################################################################
 #
 #
@@ -51,7 +97,23 @@ class FusedConfig:
     # environment var. difinition
     #
     class Item:
-        Argparse_Kargs=[
+        __slots__=(
+            '_parent',
+            '_name',
+            '_value',
+            '_set_func',
+            '_get_func',
+            '_hidden',
+            '_envvar',
+            '_argvar',
+            '_destname',
+            '_props',
+            '_argparse_kwargs',
+            '_env_type',
+            '_holders',
+        )
+        
+        Argparse_Kargs=frozenset([
             'option_strings',
             'dest',
             'nargs',
@@ -63,7 +125,7 @@ class FusedConfig:
             'required',
             'metavar',
             'action',
-        ]
+        ])
 
         #
         #  parent : parent container
@@ -99,6 +161,10 @@ class FusedConfig:
             self._argvar=None
             self._destname=None
             self._props=None
+            self._argparse_kwargs=None
+            self._env_type=None
+            # containers this item is stored in
+            self._holders=[]
             
             self._set_envprops(envvar,props)
             self._set_argprops(argvar,None)
@@ -141,13 +207,7 @@ class FusedConfig:
             if(self._argvar is None):
                 return parser
             
-            args=self._argvar
-            kargs={
-                k:self._props[k] \
-                for k in self.__class__.Argparse_Kargs if k in self._props
-            }
-
-            ret=parser.add_argument(*args,**kargs)
+            ret=parser.add_argument(*self._argvar,**self._argparse_kwargs)
             self._destname=ret.dest
             
             return parser
@@ -155,15 +215,13 @@ class FusedConfig:
         def from_env(self,env=os.environ):
             if(self._envvar is None):
                 return None
-            if(self._envvar in env):
-                v=env[self._envvar]
-                if(('type' in self._props) and \
-                   (self._props['type'] is not None)):
-                    v=self._props['type'](v)
-                
-                return self.set(v)
+            v=env.get(self._envvar)
+            if(v is None):
+                return None
+            if(self._env_type is not None):
+                v=self._env_type(v)
             
-            return None
+            return self.set(v)
         
         def add_item(self,name,value=None,**props):
             return self._parent.add_item(name,value,**props)
@@ -199,6 +257,10 @@ class FusedConfig:
                 if(self._get_func is not None):
                     raise RuntimeError('get_func is already defined.')
                 self._get_func=get_func
+            if((envvar is not None) or (argvar is not None)):
+                # the cached argument parser no longer matches
+                for sec in self._holders:
+                    sec._purge_cache()
             
             return self
         
@@ -208,11 +270,9 @@ class FusedConfig:
                 if(('type' in props) and \
                    (props['type'] is not None) and \
                    (not callable(props['type']))):
-                   raise ValueError(
-                       'unknown type "%s"' % (props['type'].__name__)
-                   )
+                    raise ValueError(f'unknown type {props["type"]!r}')
                 
-                self._props=props
+                self._set_props(props)
         
         def _set_argprops(self,argvar,props):
             self._argvar=argvar
@@ -220,54 +280,23 @@ class FusedConfig:
             if(props is None):
                 props={}
             else:
-                self._props=props
+                self._set_props(props)
                 
             if(self._argvar is not None):
                 if(not isinstance(self._argvar,(list,tuple))):
                     self._argvar=[self._argvar]
                 self._destname=self._build_destname(*self._argvar,**props)
         
-        #
-        # copied from argparse.py
-        # _ActionsContainer#_get_optional_kwargs()
-        # https://github.com/python/cpython/blob/3.13/Lib/argparse.py#L1586C9-L1586C29
-        #
+        def _set_props(self,props):
+            self._props=props
+            self._env_type=props.get('type')
+            self._argparse_kwargs={
+                k:v for k,v in props.items() \
+                if k in self.__class__.Argparse_Kargs
+            }
+        
         def _build_destname(self,*args,**kwargs):
-            prefix_chars='-'
-            
-            # determine short and long option strings
-            option_strings = []
-            long_option_strings = []
-            for option_string in args:
-                # error on strings that don't start with an appropriate prefix
-                if not option_string[0] in prefix_chars:
-                    raise ValueError(
-                        'invalid option string %s: '
-                        'must start with a character %s' % (
-                            option_string,
-                            prefix_chars
-                        )
-                    )
-                
-                # strings starting with two prefix characters are long options
-                option_strings.append(option_string)
-                if len(option_string) > 1 and option_string[1] in prefix_chars:
-                    long_option_strings.append(option_string)
-                
-            # infer destination, '--foo-bar' -> 'foo_bar' and '-x' -> 'x'
-            dest = kwargs.pop('dest', None)
-            if dest is None:
-                if long_option_strings:
-                    dest_option_string = long_option_strings[0]
-                else:
-                    dest_option_string = option_strings[0]
-                dest = dest_option_string.lstrip(prefix_chars)
-                if not dest:
-                    msg = _('dest= is required for options like %r')
-                    raise ValueError(msg % option_string)
-                dest = dest.replace('-', '_')
-
-            return dest
+            return _build_destname_cached(args,kwargs.get('dest'))
     #
     # end of FusedConfig.Item
     #
@@ -279,6 +308,8 @@ class FusedConfig:
     # This class instances do NOT have own name and value.
     #
     class Handler(Item):
+        __slots__=('_dst',)
+        
         #
         #  dst : destination object for sending value
         #  envvar : environment variable associated with this item
@@ -348,40 +379,59 @@ class FusedConfig:
         self._description=description
         self._items={}
         self._sections={}
+        # public and not hidden entries, i.e. what to_dict() dumps by default
+        self._visible_items={}
+        self._visible_sections={}
+        # containers this section is stored in
+        self._holders=[]
         self._hidden=hidden
         if((name is not None) and (hidden is None) and (name[0]=='_')):
             self._hidden=True
+        
+        # filtered views of _items/_sections, rebuilt on demand
+        self._public_items_cache=None
+        self._public_sections_cache=None
+        self._optarg_items_cache=None
+        # flattened subtree for to_dict(), see _flat_entries()
+        self._flat_cache={}
+        # (key, parser, dest of the config file option) used by parse()
+        self._parser_cache=None
 
     def __getattr__(self,name):
-        if(name in self.public_items):
-            return self._items[name]._value
-        elif(name in self.public_sections):
-            return self._sections[name]
+        # hidden names (and any lookup before __init__ has run) never
+        # reach the items/sections
+        if(self._is_public(name)):
+            item=self._items.get(name)
+            if(item is not None):
+                return item._value
+            sec=self._sections.get(name)
+            if(sec is not None):
+                return sec
         
         raise AttributeError(
-            "The object has no attribute '%s'"%(name)
+            f"The object has no attribute '{name}'"
         )
 
     def __setattr__(self,name,value):
         #
-        # When this method is calling from outside
+        # Internal attributes are always named with a leading
+        # underscore, so only public names need to be routed to
+        # the items/sections.
         #
-        # I know I'm using black magic
-        locals_=inspect.stack()[1].frame.f_locals
-        if(('self' not in locals_) or (locals_['self']!=self)):
+        if(self._is_public(name)):
             #
             # case of the item
             #
-            if(name in self.public_items):
+            if(name in self._items):
                 return self._replace_item(name,value)
             #
             # case of the section
             #
-            elif(name in self.public_sections):
+            elif(name in self._sections):
                 return self._replace_section(name,value)
             
         #
-        # Default (within calling from inside)
+        # Default (internal attributes or unknown names)
         #
         return super().__setattr__(name,value)
     
@@ -398,10 +448,14 @@ class FusedConfig:
         return len(self._items)+len(self._sections)
     
     def __contains__(self,key):
-        return key in self.all_entries
+        return (key in self._items) or (key in self._sections)
     
     def __getitem__(self,key):
-        return self.all_entries[key]
+        sec=self._sections.get(key)
+        if(sec is not None):
+            return sec
+        
+        return self._items[key]
 
     def __setitem__(self,name,value):
         if(name in self._items):
@@ -411,47 +465,53 @@ class FusedConfig:
         elif(isinstance(value,self.__class__.Item)):
             name=self._chk_name_consistency(name,value)
             self._add_item(value)
+            # Item#add_item()/add_handler() delegate to _parent, so it has
+            # to follow the container the item now lives in.
+            # (cache clearing goes through _holders instead)
+            value._parent=self
         elif(isinstance(value,self.__class__)):
             name=self._chk_name_consistency(name,value)
             if(name in self._sections):
-                raise KeyError('%s is in used'%(name))
+                raise KeyError(f'{name} is in used')
             self._sections[name]=value
+            self._hold(value)
+            value._parent=self
+            self._sort_visible(self._visible_sections,self._sections,name,value)
+            self._purge_cache()
         else:
             self.add_item(name,value)
 
     @property
     def public_items(self):
-        return self._keyname_filter(self._items)
+        return dict(self._get_public_items())
     
     @property
     def public_sections(self):
-        return self._keyname_filter(self._sections)
+        return dict(self._get_public_sections())
 
     @property
     def public_entries(self):
-        d=self.public_items
-        d.update(self.public_sections)
-        return d
+        return {**self._get_public_items(),**self._get_public_sections()}
     
     @property
     def all_entries(self):
-        d={k:v for k,v in self._items.items()}
-        d.update({k:v for k,v in self._sections.items()})
-        return d
+        return {**self._items,**self._sections}
     
     def get(self,name,*,raw=False):
-        if(name in self._items):
-            return self._items[name].get(raw=raw)
+        item=self._items.get(name)
+        if(item is not None):
+            return item.get(raw=raw)
         
         raise KeyError(name)
     
     def set(self,raw=False,**kwargs):
         for k,v in kwargs.items():
-            if(k in self._items):
-                self._items[k].set(v,raw=raw)
+            item=self._items.get(k)
+            if(item is not None):
+                item.set(v,raw=raw)
             else:
                 warnings.warn(
-                    "'%s' does not exist. ignored."%(k),
+                    f"'{k}' does not exist. ignored.",
                     UserWarning,
                     stacklevel=2
                 )
@@ -469,14 +529,23 @@ class FusedConfig:
         if(name is None):
             return self
         elif(name in self._sections):
-            raise KeyError('%s is in used'%(name))
+            raise KeyError(f'{name} is in used')
         
+        name=self._intern(name)
         sec=self.__class__(self,name,description,hidden)
         self._sections[name]=sec
+        self._hold(sec)
+        self._sort_visible(self._visible_sections,self._sections,name,sec)
+        self._purge_cache()
         return sec
     
     def from_optargs(self,opts):
-        for v in self._items.values():
+        if(self._optarg_items_cache is None):
+            # only items tied with command-line options take part
+            self._optarg_items_cache=[
+                v for v in self._items.values() if v._destname is not None
+            ]
+        for v in self._optarg_items_cache:
             v.from_optargs(opts)
         
         for v in self._sections.values():
@@ -485,6 +554,8 @@ class FusedConfig:
         return self
     
     def to_optargs(self,parser=None):
+        import argparse
+        
         if(parser is None):
             parser=argparse.ArgumentParser(
                 description=self._description
@@ -500,8 +571,9 @@ class FusedConfig:
         for v in self._items.values():
             v.to_optargs(parser)
         
-        for v in self.public_sections.values():
-            v.to_optargs(parser)
+        for k,v in self._sections.items():
+            if(self._is_public(k)):
+                v.to_optargs(parser)
         
         return parser
     
@@ -515,30 +587,122 @@ class FusedConfig:
         return self
     
     def from_dict(self,d,*,raw=False):
-        for k,v in d.items():
-            if(k in self._items):
-                self._items[k].set(v,raw=raw)
-            elif(k in self._sections):
-                self._sections[k].from_dict(d[k],raw=raw)
+        # walks the keys of d in input order; nested sections are
+        # entered through an explicit stack instead of recursion
+        stack=[(self,iter(d.items()))]
+        while(stack):
+            sec,entries=stack[-1]
+            for k,v in entries:
+                item=sec._items.get(k)
+                if(item is not None):
+                    item.set(v,raw=raw)
+                    continue
+                sub=sec._sections.get(k)
+                if(sub is not None):
+                    stack.append((sub,iter(v.items())))
+                    break
+            else:
+                stack.pop()
         
         return self
             
     def to_dict(self,*,raw=False,with_hidden_item=False):
-        d={}
-        for k,v in self.public_items.items():
-            if(with_hidden_item or (not v._hidden)):
-                d[k]=v.get(raw=raw)
-
-        for k,v in self.public_sections.items():
-            if(with_hidden_item or (not v._hidden)):
-                d[k]=v.to_dict(raw=raw,with_hidden_item=with_hidden_item)
-
-        return d
+        if(self._is_raw_copyable(raw,with_hidden_item)):
+            return self._to_dict_raw(with_hidden_item)
+        else:
+            return self._to_dict_generic(raw,with_hidden_item)
+    
+    def _to_dict_generic(self,raw,with_hidden_item):
+        dsts=[{}]
+        for p,k,v in self._flat_entries(with_hidden_item):
+            if(v is None):
+                dsts[p][k]=d={}
+                dsts.append(d)
+            else:
+                dsts[p][k]=v.get(raw=raw)
+        
+        return dsts[0]
+    
+    def _to_dict_raw(self,with_hidden_item):
+        dsts=[{}]
+        for p,k,v in self._flat_entries(with_hidden_item):
+            if(v is None):
+                dsts[p][k]=d={}
+                dsts.append(d)
+            else:
+                dsts[p][k]=v._value
+        
+        return dsts[0]
+    
+    #
+    # The entries dumped by to_dict() flattened in pre-order as
+    # (parent, name, item) tuples. A section is recorded with item=None
+    # and gets the next index, which its own entries refer to as parent;
+    # 0 is this section.
+    #
+    def _flat_entries(self,with_hidden_item):
+        flat=self._flat_cache.get(with_hidden_item)
+        if(flat is not None):
+            return flat
+        
+        flat=[]
+        n=0
+        stack=[(self,None,None)]
+        while(stack):
+            sec,p,k=stack.pop()
+            if(k is None):
+                idx=0
+            else:
+                n+=1
+                idx=n
+                flat.append((p,k,None))
+            
+            items,sections=sec._dict_entries(with_hidden_item)
+            flat.extend((idx,k,v) for k,v in items)
+            stack.extend((v,idx,k) for k,v in reversed(list(sections)))
+        
+        self._flat_cache[with_hidden_item]=flat
+        return flat
+    
+    #
+    # True when to_dict() may copy _value instead of calling get(),
+    # i.e. no dumped entry overrides Item.get() or (unless raw) has get_func.
+    # Checked on every call since get_func can be assigned at any time.
+    #
+    def _is_raw_copyable(self,raw,with_hidden_item):
+        item_get=FusedConfig.Item.get
+        for p,k,v in self._flat_entries(with_hidden_item):
+            if(v is None):
+                continue
+            if((type(v).get is not item_get) or \
+               ((not raw) and (v._get_func is not None))):
+                return False
+        
+        return True
+    
+    #
+    # (items, sections) pairs to be dumped by to_dict()
+    #
+    def _dict_entries(self,with_hidden_item):
+        if(with_hidden_item):
+            return (
+                self._get_public_items().items(),
+                self._get_public_sections().items()
+            )
+        else:
+            return (
+                self._visible_items.items(),
+                self._visible_sections.items()
+            )
     
     def load(self,fp):
+        import json
+        
         return self.from_dict(json.load(fp))
 
     def save(self,fp,*,with_hidden_item=False):
+        import json
+        
         json.dump(
             self.to_dict(with_hidden_item=with_hidden_item),
             fp,
@@ -574,16 +738,9 @@ class FusedConfig:
                     except Exception:
                         pass
         
+        opt=None
         if(not skip_optparse):
-            parser=self.to_optargs()
-            cf_attr=None
-            if(opt_file_arg):
-                if(not isinstance(opt_file_arg,(list,tuple))):
-                    opt_file_arg=[opt_file_arg]
-                cf_attr=parser.add_argument(
-                    *opt_file_arg,
-                    help='path to configration file'
-                ).dest
+            parser,cf_attr=self._build_parser(opt_file_arg)
             opt=parser.parse_args(opt_args)
             
             if(cf_attr is not None):
@@ -594,63 +751,164 @@ class FusedConfig:
         
         if(not skip_env):
             self.from_env()
-        self.from_optargs(opt)
+        if(opt is not None):
+            self.from_optargs(opt)
         
         return self
     
+    #
+    # returns (parser, dest of the config file option) for parse().
+    # The parser is reused until the items/sections are changed.
+    #
+    def _build_parser(self,opt_file_arg):
+        if(opt_file_arg and (not isinstance(opt_file_arg,(list,tuple)))):
+            opt_file_arg=[opt_file_arg]
+        key=(self._description,tuple(opt_file_arg) if opt_file_arg else None)
+        if((self._parser_cache is not None) and (self._parser_cache[0]==key)):
+            return self._parser_cache[1:]
+        
+        parser=self.to_optargs()
+        cf_attr=None
+        if(opt_file_arg):
+            cf_attr=parser.add_argument(
+                *opt_file_arg,
+                help='path to configration file'
+            ).dest
+        
+        self._parser_cache=(key,parser,cf_attr)
+        return parser,cf_attr
+    
     def _add_item(self,item):
-        name='_%d'%(len(self._items))
-        if(('_name' in vars(item)) and (item._name is not None)):
-            name=item._name
+        name=getattr(item,'_name',None)
+        if(name is None):
+            name=f'_{len(self._items)}'
+        name=self._intern(name)
         if name in self._items:
-            raise KeyError('%s is in used'%(name))
+            raise KeyError(f'{name} is in used')
         
         self._items[name]=item
+        self._hold(item)
+        self._sort_visible(self._visible_items,self._items,name,item)
+        self._purge_cache()
         
         return item
     
     def _replace_item(self,name,value):
         if(isinstance(value,self.__class__.Item)):
-            if(name==value._name):
-                self._items[name]=value
-            else:
-                raise ArgumentError(
-                    'Name does not match %s and %s'%(
-                        name,
-                        value._name
-                    )
+            if(name!=value._name):
+                raise ValueError(
+                    f'Name does not match {name} and {value._name}'
                 )
-        else:
-            self._items[name]._value=value
-            
-        return self._items[name]
+            self._release(self._items[name])
+            self._items[name]=value
+            self._hold(value)
+            value._parent=self
+            self._sort_visible(self._visible_items,self._items,name,value)
+            self._purge_cache()
+            return value
+        
+        item=self._items[name]
+        item._value=value
+        return item
 
     def _replace_section(self,name,value):
-        if(isinstance(value,self.__class__)):
-            if(name==value._name):
-                self._sections[name]=value
-            else:
-                raise ArgumentError(
-                    'Name does not match %s and %s'%(
-                        name,
-                        value._name
-                    )
-                )
-        else:
+        if(not isinstance(value,self.__class__)):
             raise TypeError(
                 'The section item shold be FusedConfig object'
             )
+        if(name!=value._name):
+            raise ValueError(
+                f'Name does not match {name} and {value._name}'
+            )
+        self._release(self._sections[name])
+        self._sections[name]=value
+        self._hold(value)
+        value._parent=self
+        self._sort_visible(self._visible_sections,self._sections,name,value)
+        self._purge_cache()
+        return value
+
+    #
+    # cached public_items/public_sections, only for internal use;
+    # the properties hand out copies
+    #
+    def _get_public_items(self):
+        if(self._public_items_cache is None):
+            self._public_items_cache=self._keyname_filter(self._items)
+        return self._public_items_cache
+    
+    def _get_public_sections(self):
+        if(self._public_sections_cache is None):
+            self._public_sections_cache=self._keyname_filter(self._sections)
+        return self._public_sections_cache
+
+    def _purge_cache(self):
+        self._public_items_cache=None
+        self._public_sections_cache=None
+        self._optarg_items_cache=None
+        # the argument parser and the flat entries cover the whole subtree,
+        # so they are cleared for every container above as well
+        seen=set()
+        stack=[self]
+        while(stack):
+            sec=stack.pop()
+            if(sec in seen):
+                continue
+            seen.add(sec)
+            sec._parser_cache=None
+            sec._flat_cache.clear()
+            stack.extend(sec._holders)
+
+    #
+    # track which containers store obj, so that changes made through
+    # obj can clear the caches of all of them
+    #
+    def _hold(self,obj):
+        if(self not in obj._holders):
+            obj._holders.append(self)
+
+    def _release(self,obj):
+        if(self in obj._holders):
+            obj._holders.remove(self)
+
+    #
+    # keep dic (_visible_items or _visible_sections) in step with the
+    # entry just stored in src (_items or _sections) under name
+    #
+    def _sort_visible(self,dic,src,name,obj):
+        if((not self._is_public(name)) or obj._hidden):
+            dic.pop(name,None)
+        elif((name in dic) or (next(reversed(src))==name)):
+            # replaced in place or appended: the order is kept as is
+            dic[name]=obj
+        else:
+            # became visible in the middle; rebuild in definition order
+            dic.clear()
+            dic.update(
+                (k,v) for k,v in src.items() \
+                if self._is_public(k) and (not v._hidden)
+            )
+
+    #
+    # names are used as dict keys on every access,
+    # interning them lets the lookups compare by identity
+    #
+    def _intern(self,name):
+        if(isinstance(name,str)):
+            return sys.intern(name)
+        return name
 
-        return self._sections[name]
+    def _is_public(self,name):
+        return bool(name) and (name[0]!='_')
 
     def _keyname_filter(self,dic):
-        return { k:dic[k] for k in dic.keys() if k[0]!='_' }
+        return { k:v for k,v in dic.items() if self._is_public(k) }
 
     def _chk_name_consistency(self,name,value):
-        if('_name' in var(value)):
+        if(getattr(value,'_name',None) is not None):
             if(name!=value._name):
                 warnings.warn(
-                    "'%s' will be replaced to '%s'."%(name,value._name),
+                    f"'{name}' will be replaced to '{value._name}'.",
                     UserWarning,
                     stacklevel=2
                 )